@@ -1,7 +1,9 @@
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import asdict, replace
-from hashlib import sha256
-from os import getenv
+from hashlib import blake2b
+from operator import attrgetter
+from os import getenv, listdir, walk
 from pathlib import Path
 from random import sample
 from shutil import copyfile
@@ -9,10 +11,9 @@ from sys import maxsize
 
 from click import secho
 from jinja2 import Environment, PackageLoader, select_autoescape
-from PIL import Image
-from PIL.Image import Resampling
 
-from scribe.io import get_asset_path
+from scribe.constants import PREVIEW_JPEG_OPTIONS, PREVIEW_MAX_WIDTH
+from scribe.io import get_asset_path, link_or_copy
 from scribe.links import local_to_remote_links
 from scribe.metadata import BuildMetadata, FeaturedPhotoPosition, NoteStatus
 from scribe.models import PageDefinition, PageDirection, TemplateArguments
@@ -21,6 +22,41 @@ from scribe.parsers import InvalidMetadataException
 from scribe.template_utilities import filter_tag, group_by_month
 
 
+def create_preview(path: Path, preview_path: Path):
+    """
+    Compress a full quality image into the preview that is shown inline with notes. Lives
+    at the module level so it can be dispatched to worker processes.
+
+    """
+    # Pillow is only needed when previews are missing, which is rare for incremental builds,
+    # so defer its import cost until an image actually has to be encoded
+    from PIL import Image
+    from PIL.Image import Resampling
+
+    # Pick the options from the file we're writing, since camera photos are commonly
+    # opened as MPO rather than JPEG while still being saved as a JPEG preview
+    is_jpeg = preview_path.suffix in {".jpg", ".jpeg"}
+
+    # Opening the image only parses its header, pixels are decoded on demand
+    image = Image.open(path)
+    if image.width <= PREVIEW_MAX_WIDTH and not is_jpeg:
+        # Images that already fit within the preview don't need to be resized, and
+        # re-encoding them would only cost time. JPEGs are still re-encoded, since the
+        # preview settings usually shrink them well below the original. The preview
+        # lives next to the note, so it's written as its own file rather than a link.
+        copyfile(path, preview_path)
+        return
+
+    # image.thumbnail((1600, maxsize), Resampling.LANCZOS)
+    image.thumbnail((PREVIEW_MAX_WIDTH, maxsize), Resampling.LANCZOS)
+    # image.save(preview_image_path, "JPEG", quality=95, dpi=(300, 300), subsampling=0)
+    image.save(
+        preview_path,
+        dpi=(300, 300),
+        **(PREVIEW_JPEG_OPTIONS if is_jpeg else {}),
+    )
+
+
 class WebsiteBuilder:
     def __init__(self):
         self.env = Environment(
@@ -31,6 +67,9 @@ class WebsiteBuilder:
         self.env.globals["group_by_month"] = group_by_month
         self.env.globals["FeaturedPhotoPosition"] = FeaturedPhotoPosition
 
+        # Previews encoded during this build, keyed by the content hash of their source
+        self.preview_cache: dict[str, Path] = {}
+
     def build(self, notes_path: str | Path, output_path: str | Path):
         notes_path = Path(notes_path).expanduser()
 
@@ -89,9 +128,9 @@ class WebsiteBuilder:
         self, notes: list[Note], output_path: Path, build_metadata: BuildMetadata
     ):
         # Upload the note assets
-        for note in notes:
-            for asset in note.assets:
-                self.process_asset(asset, output_path=output_path)
+        assets = [asset for note in notes for asset in note.assets]
+        self.process_assets(assets)
+        self.copy_assets(assets, output_path)
 
         # When developing locally it's nice to preview draft notes on the homepage as they will look live
         # But require this as an explicit env variable
@@ -180,25 +219,34 @@ class WebsiteBuilder:
 
     def build_static(self, output_path: Path, build_metadata: BuildMetadata):
         # Build static
+        # Walking the directories gets file types from the same scandir call that lists them,
+        # instead of a separate stat for each path
         static_path = get_asset_path("resources")
-        for path in static_path.glob("**/*"):
-            if not path.is_file():
-                continue
-            root_relative = path.relative_to(static_path)
-            file_output = output_path / root_relative
-            file_output.parent.mkdir(exist_ok=True)
-            copyfile(path, file_output)
+        to_copy: dict[Path, Path] = {}
+        for directory, _, filenames in walk(static_path):
+            root_relative = Path(directory).relative_to(static_path)
+            directory_output = output_path / root_relative
+            directory_output.mkdir(exist_ok=True)
+            for filename in filenames:
+                to_copy[directory_output / filename] = Path(directory) / filename
+
+        # The output directories are created during the walk, so the files themselves can
+        # be placed concurrently. Resources aren't modified by the build, so link them.
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(link_or_copy, to_copy.values(), to_copy.keys()))
 
         # Attempt to locate the built style and code paths
+        # The hashes only bust browser caches, so digest the raw bytes with blake2b rather
+        # than decoding and re-encoding the stylesheets for a cryptographic hash
         style_path = static_path / "style.css"
         code_path = static_path / "code.css"
         if style_path.exists():
-            build_metadata.style_hash = sha256(
-                style_path.read_text().encode()
+            build_metadata.style_hash = blake2b(
+                style_path.read_bytes(), digest_size=16
             ).hexdigest()
         if code_path.exists():
-            build_metadata.code_hash = sha256(
-                code_path.read_text().encode()
+            build_metadata.code_hash = blake2b(
+                code_path.read_bytes(), digest_size=16
             ).hexdigest()
 
     def get_paginated_arguments(self, notes: list[Note], limit: int):
@@ -209,33 +257,79 @@ class WebsiteBuilder:
                 offset=offset,
             )
 
-    def process_asset(self, asset: Asset, output_path: Path):
+    def process_assets(self, assets: list[Asset]):
         # Don't process preview files separately, process as part of their main asset package
-        # Compress the assets if we don't already have a compressed version
-        if not asset.local_preview_path.exists():
-            # The image quality, on a scale from 1 (worst) to 95 (best)
-            image = Image.open(asset.local_path)
-            # image.thumbnail((1600, maxsize), Resampling.LANCZOS)
-            image.thumbnail((3200, maxsize), Resampling.LANCZOS)
-            # image.save(preview_image_path, "JPEG", quality=95, dpi=(300, 300), subsampling=0)
-            image.save(
-                asset.local_preview_path,
-                quality=95,
-                dpi=(300, 300),
-                subsampling=2,  # Corresponds to 4:2:0
-                progressive=True,
+        # Compress the assets if we don't already have a compressed version. Notes that share
+        # a folder also share its assets, so only consider each source file once.
+        unique_assets = {asset.local_path: asset for asset in assets}.values()
+
+        # List each note folder once instead of stat-ing every preview path
+        folder_contents = {
+            folder: set(listdir(folder))
+            for folder in {asset.local_path.parent for asset in unique_assets}
+        }
+        missing_previews = [
+            asset
+            for asset in unique_assets
+            if asset.local_preview_path.name
+            not in folder_contents[asset.local_path.parent]
+        ]
+
+        # Hashing releases the GIL while it digests, so the images can be read in parallel
+        with ThreadPoolExecutor() as executor:
+            content_hashes = list(
+                executor.map(attrgetter("content_hash"), missing_previews)
             )
 
-        # Copy the preview image
-        # Use a relative path to make sure we place it correctly in the output path
-        remote_path = output_path / f"./{asset.remote_preview_path}"
-        if not remote_path.exists():
-            copyfile(asset.local_preview_path, remote_path)
+        to_encode: list[Asset] = []
+        duplicates: list[tuple[Asset, Path]] = []
+        for asset, content_hash in zip(missing_previews, content_hashes):
+            # The same image is commonly bundled with multiple notes; only encode it once
+            if content_hash in self.preview_cache:
+                duplicates.append((asset, self.preview_cache[content_hash]))
+                continue
 
-        # Copy the raw
-        remote_path = output_path / f"./{asset.remote_path}"
-        if not remote_path.exists():
-            copyfile(asset.local_path, remote_path)
+            self.preview_cache[content_hash] = asset.local_preview_path
+            to_encode.append(asset)
+
+        # Encoding is CPU bound, so spread the images across worker processes
+        if to_encode:
+            with ProcessPoolExecutor() as executor:
+                list(
+                    executor.map(
+                        create_preview,
+                        [asset.local_path for asset in to_encode],
+                        [asset.local_preview_path for asset in to_encode],
+                    )
+                )
+
+        # Previews are written into the notes themselves, where a hardlink would tie the
+        # edits of one note's image to another note
+        for asset, cached_preview in duplicates:
+            copyfile(cached_preview, asset.local_preview_path)
+
+    def copy_assets(self, assets: list[Asset], output_path: Path):
+        # List the images that are already in the output once, rather than checking for
+        # each of the files individually
+        images_path = output_path / "images"
+        existing_images = set(listdir(images_path))
+
+        # Copy the preview image and the raw
+        # Remote paths all live flat within /images, so the filename is enough to place
+        # them in the output without building an intermediate path for every asset
+        to_copy: dict[Path, Path] = {}
+        for asset in assets:
+            for local_path, remote_path in [
+                (asset.local_preview_path, asset.remote_preview_path),
+                (asset.local_path, asset.remote_path),
+            ]:
+                filename = remote_path.rpartition("/")[2]
+                if filename not in existing_images:
+                    to_copy[images_path / filename] = local_path
+
+        # Copies are bound by disk IO rather than the interpreter, so let them overlap
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(link_or_copy, to_copy.values(), to_copy.keys()))
 
     def augment_page_directions(self, arguments: TemplateArguments):
         """
@@ -266,16 +360,32 @@ class WebsiteBuilder:
     def get_notes(self, notes_path: Path):
         notes = []
 
+        # Filter on the raw filenames so we only build paths for the notes themselves,
+        # not every image and attachment that lives alongside them
+        note_paths = (
+            Path(directory) / filename
+            for directory, _, filenames in walk(notes_path)
+            for filename in filenames
+            if filename.endswith(".md")
+        )
+
+        # Each note is loaded independently, so overlap their file reads. Paths are handed
+        # to the pool as the walk discovers them, letting loads start before it finishes.
+        # Results are collected in discovery order to keep the build deterministic.
+        with ThreadPoolExecutor() as executor:
+            loading_notes = {
+                path: executor.submit(Note.from_file, path) for path in note_paths
+            }
+
         found_error = False
-        for path in notes_path.rglob("*"):
-            if path.suffix == ".md":
-                try:
-                    note = Note.from_file(path)
-                    if note.metadata.status in {NoteStatus.DRAFT, NoteStatus.PUBLISHED}:
-                        notes.append(note)
-                except InvalidMetadataException as e:
-                    secho(f"Invalid metadata: {path}: {e}", fg="red")
-                    found_error = True
+        for path, loading_note in loading_notes.items():
+            try:
+                note = loading_note.result()
+                if note.metadata.status in {NoteStatus.DRAFT, NoteStatus.PUBLISHED}:
+                    notes.append(note)
+            except InvalidMetadataException as e:
+                secho(f"Invalid metadata: {path}: {e}", fg="red")
+                found_error = True
 
         if found_error:
             exit()
@@ -1,2 +1,16 @@
+from typing import Any
+
+
 # Amount of notes shown on one page
 SINGLE_PAGE_NOTE_LIMIT = 5
+
+# Maximum width of the preview images that are rendered inline with notes
+PREVIEW_MAX_WIDTH = 3200
+
+# Encoder settings for JPEG previews, other formats don't accept these options. The
+# quality is on a scale from 1 (worst) to 95 (best), and subsampling 2 is 4:2:0
+PREVIEW_JPEG_OPTIONS: dict[str, Any] = {
+    "quality": 95,
+    "subsampling": 2,
+    "progressive": True,
+}
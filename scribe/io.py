@@ -1,7 +1,26 @@
 from importlib.resources import as_file, files
+from os import link
 from pathlib import Path
+from shutil import copyfile
 
 
 def get_asset_path(path):
     with as_file(files(__package__) / path) as file_path:
         return Path(file_path)
+
+
+def link_or_copy(source: Path, destination: Path):
+    """
+    Place a file at the destination without duplicating its bytes, by hardlinking it when
+    both paths share a filesystem. Falls back to a full copy otherwise.
+
+    """
+    try:
+        link(source, destination)
+    except FileExistsError:
+        # Copying over the existing file would write through any earlier link into the
+        # file it was linked from, so replace the file itself
+        destination.unlink()
+        link_or_copy(source, destination)
+    except OSError:
+        copyfile(source, destination)
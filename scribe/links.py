@@ -1,12 +1,37 @@
-from itertools import chain
+from functools import lru_cache
 from pathlib import Path
-from re import escape as re_escape, finditer, sub
+from re import Match, compile as re_compile, escape as re_escape
 
 from click import secho
 
 from scribe.note import Note
 
 
+# Markdown links that haven't been escaped with a \ prior to them, and raw html images.
+# These are scanned separately since either can be nested within the other, like an
+# image wrapped in a link.
+MARKDOWN_LINK_PATTERN = re_compile(r"(?<=[^\\])\[(.*?)\]\((.+?)\)")
+RAW_IMAGE_PATTERN = re_compile(r"<(img).*?src=[\"'](.*?)[\"'].*?/?>")
+
+IMAGE_TAG_PATTERN = re_compile(r"<img(.*?)src=[\"'](.*?)[\"'](.*?)/?>")
+
+# Links containing any of these point off the site and are left untouched
+EXTERNAL_LINK_MARKERS = ("http://", "https://", "www.")
+
+# Backslashes that escape the following character, unless they are escaped themselves
+ESCAPE_PATTERN = re_compile(r"([^\\])\\")
+
+
+@lru_cache(maxsize=None)
+def get_link_filename(link: str) -> str:
+    """
+    Links are resolved by their bare filename. The same notes and images tend to be
+    linked from many places, so cache the lookup key for each link.
+
+    """
+    return Path(link).with_suffix("").name
+
+
 def local_to_remote_links(
     note: Note,
     path_to_remote: dict[str, str],
@@ -22,49 +47,51 @@ def local_to_remote_links(
     """
     note_text = note.text
 
-    # Search for links that haven't been escaped with a \ prior to them
-    markdown_matches = finditer(r"[^\\]\[(.*?)\]\((.+?)\)", note_text)
-    img_matches = finditer(r"<(img).*?src=[\"'](.*?)[\"'].*?/?>", note_text)
-    matches = chain(markdown_matches, img_matches)
+    # Cheap substring checks let notes without any links or images skip the regex scans
+    match_patterns = [
+        pattern
+        for pattern, marker in [
+            (MARKDOWN_LINK_PATTERN, "]("),
+            (RAW_IMAGE_PATTERN, "<img"),
+        ]
+        if marker in note_text
+    ]
+
+    # [(text, link, full match)]
+    matches = [
+        (match.group(1), match.group(2), match.group(0))
+        for pattern in match_patterns
+        for match in pattern.finditer(note_text)
+    ]
 
     local_links = [
-        match
-        for match in matches
-        if not any(
-            [
-                "http://" in match.group(2),
-                "https://" in match.group(2),
-                "www." in match.group(2),
-            ]
-        )
+        (text, link, full_match)
+        for text, link, full_match in matches
+        if not any(marker in link for marker in EXTERNAL_LINK_MARKERS)
     ]
 
     # Augment the remote path with links to our media files
     # We choose to use the preview images even if the local paths are pointed
     # to the full quality versions, since this is how we want to render them on first load
-    path_to_remote = {
-        **path_to_remote,
-        **{
-            Path(asset.local_path).with_suffix("").name: asset.remote_preview_path
-            for asset in note.assets
-        },
-    }
+    # Listing the assets scans the note folder, so only do so when there's a link to resolve
+    if local_links:
+        path_to_remote = {
+            **path_to_remote,
+            **{asset.name: asset.remote_preview_path for asset in note.assets},
+        }
 
     # [(text, local link, remote link)]
     to_replace = []
 
     # Swap the local links
-    for match in local_links:
-        text = match.group(1)
-        local_link = match.group(2)
-
-        filename = Path(local_link).with_suffix("").name
+    for text, local_link, full_match in local_links:
+        filename = get_link_filename(local_link)
         if filename not in path_to_remote:
             secho("Available paths:")
             for filename, path in path_to_remote.items():
                 secho(f"{path}: `{filename}`")
             raise ValueError(
-                f"Incorrect link\n Problem Note: {note.filename}\n Link not found locally: {match.group(0)}"
+                f"Incorrect link\n Problem Note: {note.filename}\n Link not found locally: {full_match}"
             )
         remote_path = path_to_remote[filename]
         to_replace.append((text, local_link, remote_path))
@@ -74,24 +101,44 @@ def local_to_remote_links(
     #
     # We can't do this exclusively with local_path because some files may
     # share a common prefix and this will result in incorrect replacement behavior
-    for text, local_link, remote_path in to_replace:
-        search_text = f"[{text}]({local_link})"
-        replace_text = f"[{text}]({remote_path})"
-        note_text = note_text.replace(search_text, replace_text)
-
-    # Same replacement logic for raw images
-    for text, local_link, remote_path in to_replace:
-        note_text = sub(
-            f"<img(.*?)src=[\"']{re_escape(local_link)}[\"'](.*?)/?>",
-            f'<img\\1src="{re_escape(remote_path)}"\\2/>',
-            note_text,
+    link_to_remote = {
+        f"[{text}]({local_link})": f"[{text}]({remote_path})"
+        for text, local_link, remote_path in to_replace
+    }
+
+    # Swap every link in one pass over the text, rather than copying the full text once
+    # per link. Longer links are attempted first so they win over any link they contain.
+    if link_to_remote:
+        link_pattern = re_compile(
+            "|".join(
+                re_escape(search_text)
+                for search_text in sorted(link_to_remote, key=len, reverse=True)
+            )
+        )
+        note_text = link_pattern.sub(
+            lambda match: link_to_remote[match.group(0)], note_text
         )
 
+    # Same replacement logic for raw images. All image tags are rewritten in one pass
+    # over the text, instead of one scan for every local link.
+    image_to_remote = {
+        local_link: remote_path for _, local_link, remote_path in to_replace
+    }
+
+    def replace_image(match: Match) -> str:
+        remote_path = image_to_remote.get(match.group(2))
+        if remote_path is None:
+            return match.group(0)
+        return f'<img{match.group(1)}src="{remote_path}"{match.group(3)}/>'
+
+    if image_to_remote:
+        note_text = IMAGE_TAG_PATTERN.sub(replace_image, note_text)
+
     # Treat escape characters specially, since these are used as bash coloring
     note_text = note_text.replace("\\x1b", "\x1b")
     note_text = note_text.replace("\\u001b", "\u001b")
 
     # Remove other escaped characters unless we are escaping the escape
-    note_text = sub(r"([^\\])\\", r"\1", note_text)
+    note_text = ESCAPE_PATTERN.sub(r"\1", note_text)
 
     return note_text
@@ -26,6 +26,13 @@ class NoteStatus(Enum):
     PUBLISHED = "PUBLISHED"
 
 
+# Shorthand status values that are written in the note metadata
+NOTE_STATUS_ALIASES = {
+    "draft": NoteStatus.DRAFT,
+    "publish": NoteStatus.PUBLISHED,
+}
+
+
 class FeaturedPhotoPayload(BaseModel):
     path: str
     cover: FeaturedPhotoPosition = FeaturedPhotoPosition.CENTER
@@ -70,12 +77,9 @@ class NoteMetadata(BaseModel):
         if isinstance(status, NoteStatus):
             return status
 
-        if status == "draft":
-            return NoteStatus.DRAFT
-        elif status == "publish":
-            return NoteStatus.PUBLISHED
-        else:
+        if not isinstance(status, str) or status not in NOTE_STATUS_ALIASES:
             raise ValueError(f"Unknown status: `{status}`")
+        return NOTE_STATUS_ALIASES[status]
 
     class Config:
         extra = "forbid"
@@ -1,10 +1,13 @@
+from functools import cached_property, lru_cache
+from hashlib import blake2b
 from logging import warning
-from os import environ
+from os import environ, scandir
+from os.path import splitext
 from pathlib import Path
-from re import sub
+from re import IGNORECASE, Match, compile as re_compile
+from threading import local
 
-from bs4 import BeautifulSoup
-from markdown import markdown
+from markdown import Markdown
 from markdown.extensions.codehilite import CodeHiliteExtension
 from markdown.extensions.fenced_code import FencedCodeExtension
 from markdown.extensions.footnotes import FootnoteExtension
@@ -19,6 +22,71 @@ from scribe.parsers import (
 )
 
 
+# Characters that are dropped from titles when building their webpage path
+NON_SLUG_CHARACTER_PATTERN = re_compile(r"[^a-zA-Z0-9\s]")
+
+# Image tags within rendered html. Quoted attribute values may contain a >, so they're
+# consumed whole rather than ending the tag.
+HTML_IMAGE_TAG_PATTERN = re_compile(
+    r"<img\b(?:[^>\"']|\"[^\"]*\"|'[^']*')*>", IGNORECASE
+)
+
+# A single attribute within an html tag: its name, then an optional quoted or bare value.
+# Values are consumed alongside their name so text like an alt of "class=hero" is never
+# mistaken for an attribute of its own.
+HTML_ATTRIBUTE_PATTERN = re_compile(
+    r"([^\s\"'>/=]+)(?:\s*=\s*(?:\"([^\"]*)\"|'([^']*)'|([^\s\"'>]+)))?"
+)
+
+# Styling added to every image within a note's html
+IMAGE_CLASSES = "rounded-lg shadow-lg border-4 border-white dark:border-slate-600"
+
+# Travel specific styling, where images break out of the text column
+# TODO: Generalize
+TRAVEL_IMAGE_CLASSES = (
+    "lg:max-w-[100vw] lg:-ml-[125px] lg:w-offset-content-image-lg "
+    "xl:-ml-[250px] xl:w-offset-content-image-xl"
+)
+
+
+# Markdown converters are stateful while they render, so each thread keeps its own
+NOTE_MARKDOWN = local()
+
+
+def get_note_markdown() -> Markdown:
+    """
+    Configuring the converter loads every extension, so build it once per thread and
+    reset its state between notes instead of constructing a new one for each render.
+
+    """
+    converter = getattr(NOTE_MARKDOWN, "converter", None)
+    if converter is None:
+        converter = Markdown(
+            extensions=[
+                CodeHiliteExtension(use_pygments=True),
+                FencedCodeExtension(),
+                FootnoteExtension(BACKLINK_TEXT="↢"),
+                TableExtension(),
+            ],
+        )
+        NOTE_MARKDOWN.converter = converter
+    return converter.reset()
+
+
+@lru_cache(maxsize=None)
+def get_title_slug(title: str) -> str:
+    """
+    Webpage paths are requested for every asset, link, and template that references a note,
+    so cache the slug for each title rather than cleaning it again on every access.
+
+    """
+    # Published notes should have a human readible URL
+    header = title.lower()
+    header = NON_SLUG_CHARACTER_PATTERN.sub("", header)
+    header_tokens = header.split()[:20]
+    return "-".join(header_tokens)
+
+
 class Asset:
     """
     Assets are tied to their parent note. This class normalizes assets
@@ -31,11 +99,13 @@ class Asset:
         self.root_path = note.webpage_path
         self.path = Path(str(path).replace("-preview", "")).absolute()
 
-    @property
+    # The derived paths are read for every link, copy, and template that touches the
+    # asset, so they are built once and kept with the instance
+    @cached_property
     def name(self):
-        return Path(self.path).with_suffix("").name
+        return self.path.stem
 
-    @property
+    @cached_property
     def preview_name(self):
         return self.name + "-preview"
 
@@ -43,18 +113,31 @@ class Asset:
     def local_path(self):
         return self.path
 
-    @property
+    @cached_property
     def local_preview_path(self):
         return self.path.parent / f"{self.preview_name}{self.path.suffix}"
 
-    @property
+    @cached_property
     def remote_path(self):
         return f"/images/{self.root_path}-{self.name}{self.path.suffix}"
 
-    @property
+    @cached_property
     def remote_preview_path(self):
         return f"/images/{self.root_path}-{self.preview_name}{self.path.suffix}"
 
+    @property
+    def content_hash(self):
+        """
+        Digest of the raw image bytes. Identical images that are bundled with multiple
+        notes share the same hash regardless of where they live on disk.
+
+        """
+        digest = blake2b(digest_size=16)
+        with open(self.local_path, "rb") as file:
+            while chunk := file.read(1024 * 1024):
+                digest.update(chunk)
+        return digest.hexdigest()
+
     def __hash__(self):
         return hash(self.path)
 
@@ -77,6 +160,9 @@ class Note:
     filename: str | None = None
     path: Path | None = None
 
+    # Last rendered html, alongside the text it was rendered from
+    html_cache: tuple[str, str] | None = None
+
     def __init__(
         self,
         text: str,
@@ -127,32 +213,40 @@ class Note:
         """
         # Text only notes don't have assets
         if not self.path:
-            warning(f"Note {self} has no path; cannot fetch assets.")
+            warning("Note %s has no path; cannot fetch assets.", self)
             return []
 
+        # Filter on the raw directory entries so we only build paths for the images
         suffix_whitelist = {".png", ".jpeg", ".jpg"}
-        assets = []
-        for path in self.path.parent.iterdir():
-            if path.suffix in suffix_whitelist:
-                assets.append(Asset(self, path))
+        assets: dict[str, Asset] = {}
+        with scandir(self.path.parent) as entries:
+            for entry in entries:
+                if splitext(entry.name)[1] not in suffix_whitelist:
+                    continue
 
-        # De-duplicate the full images and previews, which are also found by our glob search
-        return list(set(assets))
+                # Previews are also found by our scan and normalize to their full image,
+                # so only build one asset for each full image path
+                asset_key = entry.path.replace("-preview", "")
+                if asset_key not in assets and entry.is_file():
+                    assets[asset_key] = Asset(self, Path(entry.path))
 
-    @property
+        return list(assets.values())
+
+    @cached_property
     def featured_assets(self) -> list[FeaturedPhotoPayload]:
         """
         Featured assets are located on photo collages. This function
         parses the user payloads, which can be either a raw string or a payload
         that customizes more metadata about how the photo is featured.
 
-        It returns a normalzied FeaturedPhotoPayload with an asset attached.
+        It returns a normalzied FeaturedPhotoPayload with an asset attached. Templates
+        read these several times per note, so the existence checks only run once.
 
         """
         # While technically the featured assets appear within the text, we can't get the absolute
         # path to the images without the note also having a path
         if not self.path:
-            warning(f"Note {self} has no path; cannot fetch featured assets.")
+            warning("Note %s has no path; cannot fetch featured assets.", self)
             return []
 
         featured_photos: list[FeaturedPhotoPayload] = []
@@ -186,44 +280,54 @@ class Note:
         if not self.title:
             raise ValueError(f"No header found for: {self.filename}")
 
-        # Published notes should have a human readible URL
-        header = self.title.lower()
-        header = sub(r"[^a-zA-Z0-9\s]", "", header)
-        header_tokens = header.split()[:20]
-        return "-".join(header_tokens)
+        return get_title_slug(self.title)
 
     def get_html(self):
-        html = markdown(
-            self.text,
-            extensions=[
-                CodeHiliteExtension(use_pygments=True),
-                FencedCodeExtension(),
-                FootnoteExtension(BACKLINK_TEXT="↢"),
-                TableExtension(),
-            ],
-        )
-
-        content = BeautifulSoup(html, "html.parser")
+        # The html is rendered for both the note page and the rss feed. Links are
+        # rewritten after the note is parsed, so only reuse html for the current text.
+        if self.html_cache is not None and self.html_cache[0] is self.text:
+            return self.html_cache[1]
+
+        html = self.render_html()
+        self.html_cache = (self.text, html)
+        return html
+
+    def render_html(self):
+        html = get_note_markdown().convert(self.text)
+
+        # Most notes are text only, there's nothing to style without an image tag
+        if HTML_IMAGE_TAG_PATTERN.search(html) is None:
+            return html
+
+        # Every image in the note receives the same styling, so resolve it once up front
+        added_classes = IMAGE_CLASSES
+        if "travel" in self.metadata.tags:
+            added_classes = f"{IMAGE_CLASSES} {TRAVEL_IMAGE_CLASSES}"
+
+        def style_image(match: Match) -> str:
+            image_tag = match.group(0)
+            # Attribute names are case insensitive, so look for the class attribute after
+            # the tag name rather than searching for its text anywhere in the tag
+            for attribute in HTML_ATTRIBUTE_PATTERN.finditer(image_tag, 4):
+                if attribute.group(1).lower() != "class":
+                    continue
+                existing_classes = next(
+                    (value for value in attribute.group(2, 3, 4) if value is not None),
+                    "",
+                )
+                image_classes = " ".join([*existing_classes.split(), added_classes])
+                return (
+                    image_tag[: attribute.start()]
+                    + f'class="{image_classes}"'
+                    + image_tag[attribute.end() :]
+                )
+            return f'{image_tag[:4]} class="{added_classes}"{image_tag[4:]}'
 
         # Style images - these should be located somewhere in the html dom (like in a template
         # tag - so tailwind can pick up on them)
-        for img in content.find_all("img"):
-            image_classes = img.get("class", [])
-            image_classes.append(
-                "rounded-lg shadow-lg border-4 border-white dark:border-slate-600"
-            )
-
-            # Travel specific styling
-            # TODO: Generalize
-            if "travel" in self.metadata.tags:
-                image_classes.append(
-                    "lg:max-w-[100vw] lg:-ml-[125px] lg:w-offset-content-image-lg"
-                )
-                image_classes.append("xl:-ml-[250px] xl:w-offset-content-image-xl")
-
-            img["class"] = " ".join(image_classes)
-
-        return str(content)
+        # Only the image tags change, so rewrite them in place rather than round-tripping
+        # the full document through an html parser
+        return HTML_IMAGE_TAG_PATTERN.sub(style_image, html)
 
     def has_footnotes(self):
         # Find footnote definitions in the text
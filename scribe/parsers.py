@@ -1,9 +1,9 @@
 from dataclasses import dataclass
 from datetime import datetime
-from re import findall, sub
+from html import unescape
+from re import compile as re_compile
 from typing import Any
 
-from bs4 import BeautifulSoup
 from markdown import markdown
 from pydantic import ValidationError
 from yaml import safe_load as yaml_loads
@@ -11,6 +11,15 @@ from yaml import safe_load as yaml_loads
 from scribe.metadata import NoteMetadata
 
 
+# Obsidian style image embeds, ![[image.png]]
+WIKI_IMAGE_PATTERN = re_compile(r"!\[\[(.*)\]\]")
+
+WHITESPACE_PATTERN = re_compile(r"\s")
+
+# Tags and comments within rendered html, which are dropped to leave its text
+HTML_TAG_PATTERN = re_compile(r"<[^>]*>")
+
+
 class InvalidMetadataException(Exception):
     def __init__(self, message):
         self.message = message
@@ -42,33 +51,40 @@ def parse_title(text: str) -> ParsedText:
     Determine if the first line is a header
 
     """
-    first_line = text.strip().split("\n")[0]
-    headers = findall(r"(#+)(.*)", first_line)
-    headers = sorted(headers, key=lambda x: len(x[0]))
-    if not headers:
+    first_line = text.lstrip().partition("\n")[0]
+
+    # The header runs from the first run of hashes until the end of the line
+    header_start = first_line.find("#")
+    if header_start == -1:
         raise InvalidMetadataException("No header specified.")
-    return ParsedText(result=headers[0][1].strip(), parsed_lines=[0])
+    header = first_line[header_start:].lstrip("#").strip()
+    return ParsedText(result=header, parsed_lines=[0])
 
 
 def parse_metadata(text: str) -> ParsedMetadata:
-    metadata_string = ""
+    # Scratch notes commonly omit metadata entirely, don't bother scanning their lines
+    lines = text.split("\n") if "meta:" in text else []
+
+    metadata_lines = []
     meta_started = False
     parsed_lines = []
-    for i, line in enumerate(text.split("\n")):
+    for i, line in enumerate(lines):
         # Start read with the meta: tag indication that we have
         # started to declare the dictionary, end it otherwise.
-        if line.strip() == "meta:":
+        stripped_line = line.strip()
+        if stripped_line == "meta:":
             meta_started = True
-        if line.strip() == "":
+        if stripped_line == "":
             meta_started = False
         if meta_started:
-            metadata_string += f"{line}\n"
+            metadata_lines.append(line)
             parsed_lines.append(i)
 
-    if not metadata_string:
+    if not metadata_lines:
         # If users haven't specified metadata, assume it is a scratch note
         return ParsedMetadata(result=NoteMetadata(date=datetime.now()), parsed_lines=[])
 
+    metadata_string = "\n".join(metadata_lines)
     try:
         metadata = NoteMetadata.parse_obj(yaml_loads(metadata_string)["meta"])
     except ValidationError as e:
@@ -86,12 +102,14 @@ def get_raw_text(text, parsed_payloads: list[ParsedPayload]) -> str:
 
     # Normalize image patterns to ![]()
     # Different markdown implementations have different patterns for this
-    text = sub(r"!\[\[(.*)\]\]", r"![](\1)", text)
+    text = WIKI_IMAGE_PATTERN.sub(r"![](\1)", text)
 
     return text
 
 
 def get_simple_content(text: str):
     html = markdown(text.split("\n")[0])
-    content = "".join(BeautifulSoup(html, "html.parser").findAll(text=True))
-    return sub(r"\s", " ", content)
+    # Markdown escapes any angle brackets within the text itself, so stripping the tags
+    # and decoding the entities is enough to recover the text without an html parser
+    content = unescape(HTML_TAG_PATTERN.sub("", html))
+    return WHITESPACE_PATTERN.sub(" ", content)
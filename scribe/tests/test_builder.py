@@ -1,6 +1,12 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from scribe.builder import WebsiteBuilder
+import pytest
+from PIL import Image
+
+from scribe import builder as builder_module
+from scribe.builder import WebsiteBuilder, create_preview
+from scribe.constants import PREVIEW_MAX_WIDTH
 from scribe.metadata import BuildMetadata, NoteStatus
 from scribe.models import TemplateArguments
 from scribe.note import Note
@@ -117,3 +123,98 @@ def test_augment_page_directions_middle_page(
     assert len(result.directions) == 2
     assert result.directions[0].direction == "previous"
     assert result.directions[1].direction == "next"
+
+
+def test_process_assets_shares_identical_previews(
+    builder: WebsiteBuilder, note_directory: Path, monkeypatch: pytest.MonkeyPatch
+):
+    """
+    Identical images bundled with separate notes should only be encoded once
+    """
+    # Record the encodes in this process, since a process pool can't report them back
+    encoded_paths: list[Path] = []
+
+    def record_preview(path: Path, preview_path: Path):
+        encoded_paths.append(path)
+        create_preview(path, preview_path)
+
+    monkeypatch.setattr(builder_module, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(builder_module, "create_preview", record_preview)
+
+    assets = []
+    for folder in ["first", "second"]:
+        (note_directory / folder).mkdir()
+        Image.new("RGB", (10, 10), color="red").save(
+            note_directory / folder / "image.png"
+        )
+        (note_directory / folder / "note.md").write_text(DRAFT_NOTE)
+
+        note = Note.from_file(note_directory / folder / "note.md")
+        assets += note.assets
+
+    builder.process_assets(assets)
+
+    assert len(encoded_paths) == 1
+    assert (
+        assets[0].local_preview_path.read_bytes()
+        == assets[1].local_preview_path.read_bytes()
+    )
+    assert not assets[0].local_preview_path.samefile(assets[1].local_preview_path)
+
+
+def test_process_assets_small_image_not_reencoded(
+    builder: WebsiteBuilder, note_directory: Path, tmpdir: str
+):
+    output_path = Path(tmpdir) / "output"
+    (output_path / "images").mkdir(parents=True)
+
+    Image.new("RGB", (10, 10), color="red").save(note_directory / "image.png")
+    (note_directory / "note.md").write_text(DRAFT_NOTE)
+
+    (asset,) = Note.from_file(note_directory / "note.md").assets
+    builder.process_assets([asset])
+    builder.copy_assets([asset], output_path=output_path)
+
+    assert asset.local_preview_path.read_bytes() == asset.local_path.read_bytes()
+    assert not asset.local_preview_path.samefile(asset.local_path)
+    assert (output_path / f"./{asset.remote_preview_path}").exists()
+
+
+def test_create_preview_small_jpeg_reencoded(note_directory: Path):
+    """
+    JPEGs that already fit within the preview should still be encoded with the
+    preview settings, rather than keeping the full quality original
+    """
+    Image.effect_noise((200, 200), 64).convert("RGB").save(
+        note_directory / "photo.jpg", quality=100
+    )
+
+    create_preview(note_directory / "photo.jpg", note_directory / "photo-preview.jpg")
+
+    preview_path = note_directory / "photo-preview.jpg"
+    assert Image.open(preview_path).info.get("progressive")
+    assert preview_path.stat().st_size < (note_directory / "photo.jpg").stat().st_size
+
+
+def test_create_preview_camera_jpeg_keeps_quality(note_directory: Path):
+    """
+    Multi-picture camera photos open as MPO but should still be encoded with
+    the same JPEG settings as any other photo
+    """
+    image = Image.new("RGB", (PREVIEW_MAX_WIDTH + 100, 20), color="red")
+    image.save(
+        note_directory / "camera.jpg",
+        format="MPO",
+        save_all=True,
+        append_images=[image],
+    )
+    image.save(note_directory / "photo.jpg")
+
+    for name in ["camera", "photo"]:
+        create_preview(
+            note_directory / f"{name}.jpg", note_directory / f"{name}-preview.jpg"
+        )
+
+    assert (note_directory / "camera-preview.jpg").read_bytes() == (
+        note_directory / "photo-preview.jpg"
+    ).read_bytes()
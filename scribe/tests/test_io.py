@@ -0,0 +1,40 @@
+from pathlib import Path
+
+from scribe.io import link_or_copy
+
+
+def test_link_or_copy_shares_file(tmpdir: str):
+    source = Path(tmpdir) / "source.txt"
+    source.write_text("Content")
+    destination = Path(tmpdir) / "destination.txt"
+
+    link_or_copy(source, destination)
+
+    assert destination.read_text() == "Content"
+    assert destination.stat().st_ino == source.stat().st_ino
+
+
+def test_link_or_copy_existing_destination(tmpdir: str):
+    source = Path(tmpdir) / "source.txt"
+    source.write_text("Content")
+    destination = Path(tmpdir) / "destination.txt"
+    destination.write_text("Previous content")
+
+    link_or_copy(source, destination)
+
+    assert destination.read_text() == "Content"
+
+
+def test_link_or_copy_replaces_linked_destination(tmpdir: str):
+    previous_source = Path(tmpdir) / "previous.txt"
+    previous_source.write_text("Previous content")
+    source = Path(tmpdir) / "source.txt"
+    source.write_text("Content")
+    destination = Path(tmpdir) / "destination.txt"
+
+    link_or_copy(previous_source, destination)
+    link_or_copy(source, destination)
+    link_or_copy(source, destination)
+
+    assert destination.read_text() == "Content"
+    assert previous_source.read_text() == "Previous content"
@@ -31,3 +31,30 @@ def test_remote_link_www(note_directory):
         Note.from_text(text=text, path=note_directory / "note.md"), local_mapping
     )
     new_text == text
+
+
+def test_adjacent_local_links(note_directory):
+    text = "# Header\nlinks [first](./First.md)[second](./Second.md) <img src='./First.md'/>"
+
+    local_mapping = {"First": "remote-first", "Second": "remote-second"}
+
+    new_text = local_to_remote_links(
+        Note.from_text(text=text, path=note_directory / "note.md"), local_mapping
+    )
+    assert new_text == (
+        'links [first](remote-first)[second](remote-second) <img src="remote-first"/>'
+    )
+
+
+def test_linked_raw_image(note_directory):
+    (note_directory / "image.png").write_bytes(b"")
+    text = "# Header\nx [<img src='image.png'/>](./First.md)"
+
+    local_mapping = {"First": "remote-first"}
+
+    new_text = local_to_remote_links(
+        Note.from_text(text=text, path=note_directory / "note.md"), local_mapping
+    )
+    assert new_text == (
+        'x [<img src="/images/header-image-preview.png"/>](remote-first)'
+    )
@@ -1,3 +1,4 @@
+from pathlib import Path
 from re import match
 
 from scribe.metadata import NoteStatus
@@ -71,3 +72,93 @@ def test_published():
         Note.from_text(text=text, path="/fake-path.md").metadata.status
         == NoteStatus.PUBLISHED
     )
+
+
+def test_assets_include_previews_once(note_directory: Path):
+    (note_directory / "image.png").write_bytes(b"")
+    (note_directory / "image-preview.png").write_bytes(b"")
+    (note_directory / "other.jpg").write_bytes(b"")
+    (note_directory / "note.md").write_text("# Header\nContent\n")
+
+    assets = Note.from_file(note_directory / "note.md").assets
+
+    assert sorted(asset.name for asset in assets) == ["image", "other"]
+
+
+def test_get_html_styles_images():
+    text = "# Header\n" "Content\n" "![](/images/example.png)\n"
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert 'class="rounded-lg shadow-lg' in html
+
+    text = "# Header\n" "Content\n"
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert "class=" not in html
+
+
+def test_get_html_follows_text():
+    note = Note.from_text(text="# Header\nFirst\n", path="/fake-path.md")
+    assert note.get_html() == note.get_html() == "<p>First</p>"
+
+    note.text = "Second"
+    assert note.get_html() == "<p>Second</p>"
+
+
+def test_get_html_footnotes_are_independent():
+    text = "# Header\n" "Content[^1]\n\n" "[^1]: Footnote\n"
+
+    first = Note.from_text(text=text, path="/first.md").get_html()
+    second = Note.from_text(text=text, path="/second.md").get_html()
+
+    assert first == second
+    assert first.count('class="footnote"') == 1
+
+
+def test_get_html_extends_image_classes():
+    text = "# Header\n" '<img class="wide" src="/images/example.png" />\n'
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert 'class="wide rounded-lg shadow-lg' in html
+    assert html.count("class=") == 1
+
+
+def test_simple_content():
+    text = "# Header & *Emphasis* `<code>`\n" "Content\n"
+
+    assert (
+        Note.from_text(text=text, path="/fake-path.md").simple_content
+        == "Header & Emphasis <code>"
+    )
+
+
+def test_get_html_extends_unquoted_image_classes():
+    text = "# Header\n" "<img CLASS=wide src='/images/example.png'>\n"
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert 'class="wide rounded-lg shadow-lg' in html
+    assert html.lower().count("class=") == 1
+
+
+def test_get_html_ignores_class_text_in_attributes():
+    text = (
+        "# Header\n" "![a photo with class=hero](/images/example.png 'title class=y')\n"
+    )
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert 'alt="a photo with class=hero"' in html
+    assert 'title="title class=y"' in html
+    assert '<img class="rounded-lg shadow-lg' in html
+
+
+def test_get_html_styles_uppercase_image_tags():
+    text = "# Header\n" "<IMG SRC='/images/example.png'>\n"
+
+    html = Note.from_text(text=text, path="/fake-path.md").get_html()
+
+    assert '<IMG class="rounded-lg shadow-lg' in html